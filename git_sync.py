@@ -1,13 +1,29 @@
 import os
 import json
-from datetime import datetime
-from typing import Optional, Dict, List
+import functools
+import hashlib
+from typing import Optional, Dict, Iterator, List, Sequence
 import logging
+import queue
+import re
+import shlex
+from datetime import datetime
 from github import Github
-from pathlib import Path
 import subprocess
+import threading
+import time
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import pygit2
+except ImportError:  # pragma: no cover - pygit2 is optional
+    pygit2 = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -15,43 +31,344 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Read-only git commands that can be answered by the persistent cat-file process
+BATCH_COMMANDS = ('rev-parse', 'cat-file', 'show')
+
+# Fixed argv prefixes for the sync pipeline
+GIT_ADD = ('git', 'add', '--')
+GIT_COMMIT = ('git', 'commit', '--no-verify', '--no-gpg-sign', '--quiet', '-m')
+GIT_REV_PARSE_HEAD = ('git', 'rev-parse', 'HEAD')
+GIT_PUSH = ('git', 'push')
+GIT_FAST_IMPORT = ('git', 'fast-import', '--quiet', '--date-format=raw')
+
+# Directory inside the repository that holds one JSON file per message
+MESSAGES_DIR = 'messages'
+
+# Message content larger than this many bytes is stored out of band under
+# OOB_DIR, named by its SHA-256, and only referenced from the committed file
+OOB_THRESHOLD = 64 * 1024
+OOB_DIR = 'oob'
+OOB_DIGEST_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# Characters git strips from identity names and emails, since they delimit signatures
+IDENT_UNSAFE = str.maketrans('', '', '<>\n')
+
+# Full-length SHA-1 or SHA-256 object name on a line of its own
+COMMIT_HASH_PATTERN = re.compile(r'^(?:[0-9a-f]{40}|[0-9a-f]{64})$', re.MULTILINE)
+
+# Background pushes happen after this many queued commits or seconds, whichever comes first
+PUSH_BATCH_SIZE = 20
+PUSH_INTERVAL = 1.0
+
+# Queue entry that ends the background push thread
+PUSH_STOP = object()
+
+# Pushes over SSH share one multiplexed connection kept open for this many seconds
+SSH_CONTROL_DIR = os.path.expanduser('~/.cache/aichat/ssh')
+SSH_CONTROL_PERSIST = 600
+
+# Remote URLs that git reaches over SSH: ssh:// URLs and scp-like [user@]host:path
+SSH_URL_PATTERN = re.compile(r'^(?:(?:ssh|git\+ssh|ssh\+git)://|[^/:]+:(?!//))')
+
+# User-level cache of mirrored repositories, keyed by remote URL
+CLONE_CACHE_DIR = os.path.expanduser('~/.cache/aichat/gitcache')
+
+
+def serialize_message(message: Dict) -> bytes:
+    """
+    Serialize a message to UTF-8 encoded JSON.
+    
+    Args:
+        message: Dictionary containing message data
+        
+    Returns:
+        JSON document as bytes
+    """
+    if orjson is not None:
+        return orjson.dumps(message)
+    # Match orjson byte for byte: compact separators and raw UTF-8
+    return json.dumps(message, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def message_file(message: Dict) -> tuple[str, bytes]:
+    """
+    Build the file name and contents used to store a message.
+    
+    Args:
+        message: Dictionary containing message data
+        
+    Returns:
+        Tuple of (filename, serialized message)
+    """
+    # Slice "YYYY-MM-DDTHH:MM:SS..." directly instead of parsing it
+    timestamp = message['timestamp']
+    filename = (
+        f"{timestamp[0:4]}{timestamp[5:7]}{timestamp[8:10]}_"
+        f"{timestamp[11:13]}{timestamp[14:16]}{timestamp[17:19]}_{message['id']}.json"
+    )
+    return filename, serialize_message(message)
+
+
+def signature_time(date: Optional[str] = None) -> tuple[int, int]:
+    """
+    Convert an ISO-8601 date into the time format used in git signatures.
+    
+    Args:
+        date: ISO-8601 date, or None for the current time
+        
+    Returns:
+        Tuple of (seconds since the epoch, UTC offset in minutes)
+    """
+    when = datetime.fromisoformat(date) if date else datetime.now()
+    if when.tzinfo is None:
+        # Naive timestamps are local time, as git itself assumes
+        when = when.astimezone()
+    return int(when.timestamp()), int(when.utcoffset().total_seconds()) // 60
+
 class GitSyncManager:
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, oob_dir: Optional[str] = None):
         """
         Initialize GitSyncManager.
         
         Args:
             repo_path: Path to the local Git repository
+            oob_dir: Directory for content stored out of band; defaults to
+                `oob` inside the worktree, or to a `<repo_path>.oob` sibling
+                for bare repositories so nothing is written into the git directory
         """
-        load_dotenv()
         self.repo_path = repo_path
-        self.messages_dir = os.path.join(repo_path, 'messages')
-        self.github_token = os.getenv('GITHUB_TOKEN')
-        self.repo_name = os.getenv('GITHUB_REPO')
+        self.messages_dir = os.path.join(repo_path, MESSAGES_DIR)
+        self.github_token, self.repo_name = self._get_config()
+        self.github = Github(self.github_token)
+
+        # Long-running `git cat-file --batch` process, started on first use
+        self._cat_file = None
+        self._cat_file_lock = threading.Lock()
+        
+        # Cached number of message files and the directory mtime it was taken at
+        self._message_count = None
+        self._messages_mtime = None
+        self._count_lock = threading.Lock()
+        
+        # In-process repository access, or None to use the git command line
+        self._repo = self._open_repository()
         
-        if not self.github_token or not self.repo_name:
+        # Bare repositories have no worktree; commits are built from object data
+        if self._repo is not None:
+            self.is_bare = self._repo.is_bare
+        else:
+            self.is_bare = self._is_bare_repository(repo_path)
+        if not self.is_bare:
+            os.makedirs(self.messages_dir, exist_ok=True)
+        if oob_dir is None:
+            if self.is_bare:
+                oob_dir = f"{os.path.normpath(repo_path)}.{OOB_DIR}"
+            else:
+                oob_dir = os.path.join(repo_path, OOB_DIR)
+        self.oob_dir = oob_dir
+        
+        # Author and committer identities as resolved by git, looked up on first commit
+        self._idents = {}
+        
+        # Whether pushes go over SSH, looked up on first push
+        self._ssh_remote = None
+        
+        # Commits waiting for the background push thread, started on first use
+        self._commit_lock = threading.Lock()
+        self._push_queue = queue.Queue()
+        self._push_thread = None
+        
+        # Set while queued commits have not reached the remote yet
+        self._push_pending = False
+
+    @classmethod
+    @functools.cache
+    def _get_config(cls) -> tuple[str, str]:
+        """
+        Load and validate the GitHub configuration once per process.
+        
+        Returns:
+            Tuple of (github_token, repo_name)
+            
+        Raises:
+            ValueError: If GITHUB_TOKEN or GITHUB_REPO is not set
+        """
+        load_dotenv()
+        github_token = os.getenv('GITHUB_TOKEN')
+        repo_name = os.getenv('GITHUB_REPO')
+        
+        if not github_token or not repo_name:
             raise ValueError("GITHUB_TOKEN and GITHUB_REPO must be set in .env file")
+        
+        return github_token, repo_name
+
+    @classmethod
+    def reset_config_cache(cls):
+        """Forget the cached configuration so it is read again on next use."""
+        cls._get_config.cache_clear()
+
+    @staticmethod
+    def _is_bare_repository(path: str) -> bool:
+        """
+        Check whether a path looks like a bare git repository.
+        
+        Args:
+            path: Path to check
             
-        self.github = Github(self.github_token)
-        Path(self.messages_dir).mkdir(parents=True, exist_ok=True)
+        Returns:
+            True if the path is a bare repository, False otherwise
+        """
+        return (
+            not os.path.exists(os.path.join(path, '.git'))
+            and os.path.isfile(os.path.join(path, 'HEAD'))
+            and os.path.isdir(os.path.join(path, 'objects'))
+        )
+
+    def _open_repository(self):
+        """
+        Open the repository with pygit2 if it is installed.
+        
+        Returns:
+            pygit2.Repository instance, or None if unavailable
+        """
+        if pygit2 is None:
+            return None
+        try:
+            return pygit2.Repository(self.repo_path)
+        except pygit2.GitError:
+            return None
+
+    def close(self):
+        """Push queued commits, then stop the push thread and the persistent cat-file process."""
+        if not self.flush():
+            logger.warning("Closing with queued commits that were not pushed")
+        self._stop_push_thread()
+        self._stop_cat_file()
+
+    def _stop_push_thread(self):
+        """Stop the background push thread if it is running."""
+        with self._commit_lock:
+            push_thread, self._push_thread = self._push_thread, None
+        if push_thread is not None:
+            self._push_queue.put(PUSH_STOP)
+            push_thread.join()
 
-    def _run_git_command(self, command: List[str]) -> tuple[int, str, str]:
+    def _stop_cat_file(self):
+        """Stop the persistent cat-file process if it is running."""
+        with self._cat_file_lock:
+            if self._cat_file is not None:
+                try:
+                    self._cat_file.stdin.close()
+                    self._cat_file.wait(timeout=5)
+                except (OSError, subprocess.SubprocessError):
+                    self._cat_file.kill()
+                self._cat_file = None
+
+    def _cat_file_query(self, spec: str) -> Optional[tuple[str, str, bytes]]:
+        """
+        Look up an object through the persistent `git cat-file --batch` process.
+        
+        Args:
+            spec: Object name understood by git (e.g. `HEAD` or `HEAD:path`)
+            
+        Returns:
+            Tuple of (sha, type, payload), or None if the object is missing
+        """
+        with self._cat_file_lock:
+            if self._cat_file is None or self._cat_file.poll() is not None:
+                self._cat_file = subprocess.Popen(
+                    ['git', 'cat-file', '--batch'],
+                    cwd=self.repo_path,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL
+                )
+            
+            self._cat_file.stdin.write(spec.encode('utf-8') + b'\n')
+            self._cat_file.stdin.flush()
+            
+            # Reply is framed as "<sha> <type> <size>\n<payload>\n"
+            header = self._cat_file.stdout.readline().decode('utf-8').rstrip('\n')
+            if header.endswith((' missing', ' ambiguous')):
+                return None
+            
+            fields = header.split(' ')
+            if len(fields) != 3:
+                raise ValueError(f"Unexpected cat-file reply: {header!r}")
+            
+            sha, object_type, size = fields
+            payload = self._cat_file.stdout.read(int(size) + 1)
+            return sha, object_type, payload[:-1]
+
+    def _run_batch_command(self, command: List[str]) -> Optional[tuple[int, str, str]]:
+        """
+        Answer a read-only git command from the persistent cat-file process.
+        
+        Args:
+            command: List of command arguments
+            
+        Returns:
+            Tuple of (return_code, stdout, stderr), or None if the command
+            has to be run as a regular git process
+        """
+        if len(command) == 2 and command[0] in ('rev-parse', 'show'):
+            spec = command[1]
+        elif len(command) == 3 and command[0] == 'cat-file':
+            spec = command[2]
+        else:
+            return None
+        
+        if spec.startswith('-') or '\n' in spec:
+            return None
+        
+        try:
+            result = self._cat_file_query(spec)
+        except (OSError, ValueError) as e:
+            logger.warning(f"cat-file query failed, falling back to git: {e}")
+            self._stop_cat_file()
+            return None
+        
+        # Let git itself report missing objects
+        if result is None:
+            return None
+        
+        sha, object_type, payload = result
+        if command[0] == 'rev-parse':
+            return 0, sha + '\n', ''
+        if command[0] == 'show' and object_type != 'blob':
+            return None
+        if command[0] == 'cat-file' and command[1] not in ('-p', object_type):
+            return None
+        if object_type == 'tree':
+            # Raw tree objects differ from git's pretty-printed output
+            return None
+        return 0, payload.decode('utf-8'), ''
+
+    def _run_git_command(self, command: List[str],
+                         env: Optional[Dict[str, str]] = None) -> tuple[int, str, str]:
         """
         Run a git command and return the result.
         
         Args:
             command: List of command arguments
+            env: Optional environment for the git process
             
         Returns:
             Tuple of (return_code, stdout, stderr)
         """
+        if command and command[0] in BATCH_COMMANDS:
+            result = self._run_batch_command(command)
+            if result is not None:
+                return result
+        
         try:
             process = subprocess.Popen(
                 ['git'] + command,
                 cwd=self.repo_path,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True
+                text=True,
+                env=env
             )
             stdout, stderr = process.communicate()
             return process.returncode, stdout, stderr
@@ -59,58 +376,649 @@ class GitSyncManager:
             logger.error(f"Git command failed: {e}")
             return 1, "", str(e)
 
-    def sync_message(self, message: Dict) -> Optional[str]:
+    def _run_git_pipeline(self, commands: List[Sequence[str]],
+                          env: Optional[Dict[str, str]] = None,
+                          input_data: Optional[bytes] = None) -> tuple[int, str, str]:
         """
-        Sync a message to GitHub.
+        Run several git commands in one shell process, stopping at the first failure.
+        
+        Args:
+            commands: List of complete git command lines, including `git`
+            env: Optional environment for the shell process
+            input_data: Optional bytes fed to the first command's stdin
+            
+        Returns:
+            Tuple of (return_code, stdout, stderr) for the whole pipeline
+        """
+        if os.name == 'nt':
+            # No POSIX shell to chain the commands in
+            return self._run_git_sequence(commands, env, input_data)
+        
+        script = ' && '.join(shlex.join(command) for command in commands)
+        try:
+            if input_data is None:
+                process = subprocess.Popen(
+                    ['sh', '-c', script],
+                    cwd=self.repo_path,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    text=True,
+                    env=env
+                )
+                stdout, stderr = process.communicate()
+                return process.returncode, stdout, stderr
+            
+            process = subprocess.Popen(
+                ['sh', '-c', script],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env
+            )
+            stdout, stderr = process.communicate(input_data)
+            return process.returncode, stdout.decode('utf-8', 'replace'), stderr.decode('utf-8', 'replace')
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"Git pipeline failed: {e}")
+            return 1, "", str(e)
+
+    def _run_git_sequence(self, commands: List[Sequence[str]],
+                          env: Optional[Dict[str, str]] = None,
+                          input_data: Optional[bytes] = None) -> tuple[int, str, str]:
+        """
+        Run several git commands one after another, stopping at the first failure.
+        
+        Args:
+            commands: List of complete git command lines, including `git`
+            env: Optional environment for the git processes
+            input_data: Optional bytes fed to the first command's stdin
+        
+        Returns:
+            Tuple of (return_code, stdout, stderr) for the whole sequence
+        """
+        stdout_parts, stderr_parts = [], []
+        try:
+            for command in commands:
+                process = subprocess.Popen(
+                    list(command),
+                    cwd=self.repo_path,
+                    stdin=subprocess.PIPE if input_data is not None else None,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    env=env
+                )
+                stdout, stderr = process.communicate(input_data)
+                input_data = None
+                stdout_parts.append(stdout.decode('utf-8', 'replace'))
+                stderr_parts.append(stderr.decode('utf-8', 'replace'))
+                if process.returncode != 0:
+                    return process.returncode, ''.join(stdout_parts), ''.join(stderr_parts)
+            return 0, ''.join(stdout_parts), ''.join(stderr_parts)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.error(f"Git command failed: {e}")
+            return 1, ''.join(stdout_parts), str(e)
+
+    def _write_message_file(self, filename: str, data: bytes) -> str:
+        """
+        Write a serialized message to the messages directory.
+        
+        Args:
+            filename: Name of the message file
+            data: Serialized message
+            
+        Returns:
+            Path of the written file
+        """
+        file_path = os.path.join(self.messages_dir, filename)
+        
+        # Write message to file, bypassing Python's buffered file objects
+        data = memoryview(data)
+        with self._count_lock:
+            # The cached count stays valid only if nobody else touched the directory
+            track_count = (
+                self._message_count is not None
+                and os.stat(self.messages_dir).st_mtime_ns == self._messages_mtime
+            )
+            try:
+                fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                created = True
+            except FileExistsError:
+                fd = os.open(file_path, os.O_WRONLY | os.O_TRUNC)
+                created = False
+            
+            if track_count and created:
+                self._message_count += 1
+                self._messages_mtime = os.stat(self.messages_dir).st_mtime_ns
+        
+        try:
+            while data:
+                data = data[os.write(fd, data):]
+        finally:
+            os.close(fd)
+        
+        return file_path
+
+    def _store_out_of_band(self, message: Dict) -> Dict:
+        """
+        Move large message content out of band, leaving a reference in its place.
         
         Args:
             message: Dictionary containing message data
             
         Returns:
-            Git commit hash if successful, None otherwise
+            The message itself if its content is small, otherwise a copy whose
+            content is replaced by {'oob': sha256, 'size': length}
+        """
+        content = message.get('content')
+        if not isinstance(content, str) or len(content) <= OOB_THRESHOLD // 4:
+            # Even 4-byte UTF-8 characters cannot push this over the threshold
+            return message
+        
+        data = content.encode('utf-8')
+        if len(data) <= OOB_THRESHOLD:
+            return message
+        
+        digest = hashlib.sha256(data).hexdigest()
+        oob_path = os.path.join(self.oob_dir, digest)
+        if not os.path.exists(oob_path):
+            os.makedirs(self.oob_dir, exist_ok=True)
+            
+            # Content-addressed, so a complete file never needs rewriting
+            temp_path = f"{oob_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, oob_path)
+        
+        return dict(message, content={'oob': digest, 'size': len(data)})
+
+    def read_message(self, filename: str) -> Optional[Dict]:
+        """
+        Read a synced message, resolving content that was stored out of band.
+        
+        Args:
+            filename: Name of the message file
+            
+        Returns:
+            Dictionary containing message data if successful, None otherwise
         """
         try:
-            # Create message file
-            timestamp = datetime.fromisoformat(message['timestamp'])
-            filename = f"{timestamp.strftime('%Y%m%d_%H%M%S')}_{message['id']}.json"
-            file_path = os.path.join(self.messages_dir, filename)
+            if self.is_bare:
+                returncode, stdout, stderr = self._run_git_command(['show', f"HEAD:{MESSAGES_DIR}/{filename}"])
+                if returncode != 0:
+                    logger.error(f"Failed to read message {filename}: {stderr}")
+                    return None
+                message = json.loads(stdout)
+            else:
+                with open(os.path.join(self.messages_dir, filename), 'rb') as f:
+                    message = json.loads(f.read())
             
-            # Write message to file
-            with open(file_path, 'w') as f:
-                json.dump(message, f, indent=2)
+            content = message.get('content')
+            if isinstance(content, dict) and 'oob' in content:
+                # The reference may come from the remote; never let it name another file
+                digest = content['oob']
+                if not isinstance(digest, str) or OOB_DIGEST_PATTERN.fullmatch(digest) is None:
+                    raise ValueError(f"Invalid out-of-band reference: {digest!r}")
+                with open(os.path.join(self.oob_dir, digest), 'rb') as f:
+                    message['content'] = f.read().decode('utf-8')
             
-            # Stage the file
-            returncode, stdout, stderr = self._run_git_command(['add', file_path])
+            return message
+            
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to read message {filename}: {str(e)}")
+            return None
+
+    def iter_messages(self) -> Iterator[str]:
+        """
+        Iterate over the names of the message files.
+        
+        Bare repositories have no messages directory, so their names are
+        listed from the messages tree at HEAD instead.
+        
+        Returns:
+            Iterator of message file names
+        """
+        if self.is_bare:
+            returncode, stdout, stderr = self._run_git_command(['ls-tree', '--name-only', f'HEAD:{MESSAGES_DIR}'])
             if returncode != 0:
-                logger.error(f"Failed to stage file: {stderr}")
-                return None
+                # An unborn branch or a tree without messages has none yet
+                return
+            for name in stdout.splitlines():
+                if name.endswith('.json'):
+                    yield name
+            return
+        
+        with os.scandir(self.messages_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json'):
+                    yield entry.name
+
+    def count_messages(self) -> int:
+        """
+        Count the message files, rescanning only if the directory changed.
+        
+        Returns:
+            Number of message files
+        """
+        if self.is_bare:
+            # HEAD's tree is listed on every call; there is no directory mtime to check
+            return sum(1 for _ in self.iter_messages())
+        
+        with self._count_lock:
+            mtime = os.stat(self.messages_dir).st_mtime_ns
+            if self._message_count is None or mtime != self._messages_mtime:
+                self._message_count = sum(1 for _ in self.iter_messages())
+                self._messages_mtime = mtime
+            return self._message_count
+
+    def _git_ident(self, variable: str) -> tuple[str, str]:
+        """
+        Look up an identity the way `git commit` resolves it.
+        
+        GIT_AUTHOR_* and GIT_COMMITTER_* environment variables take precedence
+        over the user.name and user.email configuration, as they do for git.
+        
+        Args:
+            variable: GIT_AUTHOR_IDENT or GIT_COMMITTER_IDENT
             
-            # Create commit
-            commit_message = f"Add message {message['id']} from {message['sender']}"
-            returncode, stdout, stderr = self._run_git_command([
-                'commit',
-                '-m', commit_message,
-                '--author', f"{message['sender']} <{message['sender']}@example.com>"
-            ])
+        Returns:
+            Tuple of (name, email)
+            
+        Raises:
+            ValueError: If git cannot determine the identity
+        """
+        if variable not in self._idents:
+            returncode, stdout, stderr = self._run_git_command(['var', variable])
             if returncode != 0:
-                logger.error(f"Failed to commit: {stderr}")
+                raise ValueError(f"Failed to get {variable}: {stderr}")
+            # "Name <email> timestamp offset"
+            name, _, email = stdout.strip().rsplit(' ', 2)[0].partition('<')
+            self._idents[variable] = name.strip(), email.rstrip('>')
+        return self._idents[variable]
+
+    def _signatures(self, author: Optional[tuple[str, str]] = None,
+                    date: Optional[str] = None):
+        """
+        Build the pygit2 author and committer signatures for a commit.
+        
+        Args:
+            author: Optional commit author as (name, email)
+            date: Optional ISO-8601 author and committer date
+            
+        Returns:
+            Tuple of (author, committer) signatures
+        """
+        if author:
+            # pygit2 rejects what git would silently strip
+            author = tuple(part.translate(IDENT_UNSAFE) for part in author)
+        else:
+            author = self._git_ident('GIT_AUTHOR_IDENT')
+        when = signature_time(date)
+        return (
+            pygit2.Signature(*author, *when),
+            pygit2.Signature(*self._git_ident('GIT_COMMITTER_IDENT'), *when)
+        )
+
+    def _commit_in_process(self, files: Dict[str, bytes], commit_message: str,
+                           author: Optional[tuple[str, str]] = None,
+                           date: Optional[str] = None) -> str:
+        """
+        Commit message files with pygit2, without starting git processes.
+        
+        Blobs are hashed from the serialized data already in memory and staged
+        directly, instead of reading the written files back as `git add` would.
+        
+        Args:
+            files: Mapping of message file name to serialized message
+            commit_message: Commit message
+            author: Optional commit author as (name, email)
+            date: Optional ISO-8601 author and committer date
+            
+        Returns:
+            Git commit hash
+        """
+        author_signature, committer = self._signatures(author, date)
+        
+        workdir = os.path.realpath(self._repo.workdir)
+        messages_path = os.path.relpath(os.path.realpath(self.messages_dir), workdir).replace(os.sep, '/')
+        index = self._repo.index
+        index.read()
+        for filename, data in files.items():
+            index.add(pygit2.IndexEntry(
+                f"{messages_path}/{filename}",
+                self._repo.create_blob(data),
+                pygit2.GIT_FILEMODE_BLOB
+            ))
+        tree = index.write_tree()
+        
+        parents = [] if self._repo.head_is_unborn else [self._repo.head.target]
+        commit_id = self._repo.create_commit(
+            'HEAD', author_signature, committer, commit_message + '\n', tree, parents
+        )
+        
+        # Only persist the staged files once they are committed
+        index.write()
+        return str(commit_id)
+
+    def _commit_tree_in_process(self, files: Dict[str, bytes], commit_message: str,
+                                author: Optional[tuple[str, str]] = None,
+                                date: Optional[str] = None) -> str:
+        """
+        Commit message data to a bare repository with pygit2.
+        
+        Blobs are created straight from the serialized data and the new tree is
+        derived from HEAD's tree, so neither a worktree nor an index is touched.
+        
+        Args:
+            files: Mapping of message file name to serialized message
+            commit_message: Commit message
+            author: Optional commit author as (name, email)
+            date: Optional ISO-8601 author and committer date
+            
+        Returns:
+            Git commit hash
+        """
+        author_signature, committer = self._signatures(author, date)
+        
+        if self._repo.head_is_unborn:
+            parents = []
+            root_builder = self._repo.TreeBuilder()
+            messages_builder = self._repo.TreeBuilder()
+        else:
+            parents = [self._repo.head.target]
+            root = self._repo.head.peel(pygit2.Commit).tree
+            root_builder = self._repo.TreeBuilder(root)
+            if MESSAGES_DIR in root:
+                messages_builder = self._repo.TreeBuilder(root[MESSAGES_DIR])
+            else:
+                messages_builder = self._repo.TreeBuilder()
+        
+        for filename, data in files.items():
+            messages_builder.insert(filename, self._repo.create_blob(data), pygit2.GIT_FILEMODE_BLOB)
+        root_builder.insert(MESSAGES_DIR, messages_builder.write(), pygit2.GIT_FILEMODE_TREE)
+        tree = root_builder.write()
+        
+        commit_id = self._repo.create_commit(
+            'HEAD', author_signature, committer, commit_message + '\n', tree, parents
+        )
+        return str(commit_id)
+
+    def _fast_import_stream(self, files: Dict[str, bytes], commit_message: str,
+                            author: Optional[tuple[str, str]] = None,
+                            date: Optional[str] = None) -> bytes:
+        """
+        Build a `git fast-import` stream that commits message data to a bare repository.
+        
+        Args:
+            files: Mapping of message file name to serialized message
+            commit_message: Commit message
+            author: Optional commit author as (name, email)
+            date: Optional ISO-8601 author and committer date
+            
+        Returns:
+            fast-import stream as bytes
+        """
+        with open(os.path.join(self.repo_path, 'HEAD')) as f:
+            head = f.read().strip()
+        if not head.startswith('ref: '):
+            raise ValueError("Bare repository HEAD must point to a branch")
+        ref = head[len('ref: '):]
+        
+        seconds, offset = signature_time(date)
+        when = f"{seconds} {'-' if offset < 0 else '+'}{abs(offset) // 60:02d}{abs(offset) % 60:02d}"
+        if author:
+            # Keep the sender from ending the author line and injecting commands
+            author_ident = f"{author[0].translate(IDENT_UNSAFE)} <{author[1].translate(IDENT_UNSAFE)}>"
+        else:
+            author_ident = "{} <{}>".format(*self._git_ident('GIT_AUTHOR_IDENT'))
+        committer_ident = "{} <{}>".format(*self._git_ident('GIT_COMMITTER_IDENT'))
+        message = (commit_message + '\n').encode('utf-8')
+        
+        stream = [
+            f"commit {ref}\n"
+            f"author {author_ident} {when}\n"
+            f"committer {committer_ident} {when}\n"
+            f"data {len(message)}\n".encode('utf-8'),
+            message
+        ]
+        
+        # A missing ref means this is the first commit on the branch
+        returncode, stdout, stderr = self._run_git_command(['rev-parse', ref])
+        if returncode == 0:
+            stream.append(f"from {stdout.strip()}\n".encode('utf-8'))
+        
+        for filename, data in files.items():
+            if '\n' in filename or filename.startswith('"'):
+                raise ValueError(f"Invalid message file name: {filename!r}")
+            stream.append(f"M 100644 inline {MESSAGES_DIR}/{filename}\ndata {len(data)}\n".encode('utf-8'))
+            stream.append(data)
+            stream.append(b'\n')
+        
+        return b''.join(stream)
+
+    def _uses_ssh(self) -> bool:
+        """
+        Check whether the default remote is reached over SSH.
+        
+        Returns:
+            True if pushes go over SSH, False otherwise
+        """
+        if self._ssh_remote is None:
+            returncode, stdout, stderr = self._run_git_command(['ls-remote', '--get-url'])
+            self._ssh_remote = returncode == 0 and SSH_URL_PATTERN.match(stdout.strip()) is not None
+        return self._ssh_remote
+
+    def _get_push_env(self) -> Optional[Dict[str, str]]:
+        """
+        Build the environment for git processes that push to the remote.
+        
+        SSH pushes go through a shared ControlMaster connection, so only the
+        first push within SSH_CONTROL_PERSIST seconds pays for the handshake.
+        
+        Returns:
+            Environment dictionary, or None to inherit the current environment
+        """
+        # Respect an SSH setup configured by the user; Windows OpenSSH lacks ControlMaster
+        if os.name == 'nt' or 'GIT_SSH_COMMAND' in os.environ or 'GIT_SSH' in os.environ:
+            return None
+        if not self._uses_ssh():
+            return None
+        
+        try:
+            os.makedirs(SSH_CONTROL_DIR, mode=0o700, exist_ok=True)
+        except OSError as e:
+            # Pushing without a shared connection beats not pushing at all
+            logger.warning(f"Failed to create SSH control directory: {str(e)}")
+            return None
+        
+        ssh_command = shlex.join([
+            'ssh',
+            '-o', 'ControlMaster=auto',
+            '-o', f"ControlPath={os.path.join(SSH_CONTROL_DIR, '%r@%h:%p')}",
+            '-o', f'ControlPersist={SSH_CONTROL_PERSIST}'
+        ])
+        return dict(os.environ, GIT_SSH_COMMAND=ssh_command)
+
+    def _push(self) -> bool:
+        """
+        Push local commits to GitHub.
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        returncode, stdout, stderr = self._run_git_command(['push'], env=self._get_push_env())
+        if returncode != 0:
+            logger.error(f"Failed to push: {stderr}")
+            return False
+        return True
+
+    def _commit(self, files: Dict[str, bytes], commit_message: str,
+                author: Optional[tuple[str, str]] = None, date: Optional[str] = None,
+                push: bool = False) -> Optional[str]:
+        """
+        Store and commit message files, optionally pushing the commit to GitHub.
+        
+        Args:
+            files: Mapping of message file name to serialized message
+            commit_message: Commit message
+            author: Optional commit author as (name, email)
+            date: Optional ISO-8601 author and committer date
+            push: Push the commit before returning
+            
+        Returns:
+            Git commit hash if successful, None otherwise
+        """
+        if not self.is_bare:
+            file_paths = [self._write_message_file(filename, data) for filename, data in files.items()]
+        
+        if self._repo is not None:
+            with self._commit_lock:
+                if self.is_bare:
+                    commit_hash = self._commit_tree_in_process(files, commit_message, author, date)
+                else:
+                    commit_hash = self._commit_in_process(files, commit_message, author, date)
+            
+            if push and not self._push():
                 return None
             
-            # Get commit hash
-            returncode, stdout, stderr = self._run_git_command([
-                'rev-parse',
-                'HEAD'
-            ])
-            if returncode != 0:
-                logger.error(f"Failed to get commit hash: {stderr}")
+            return commit_hash
+        
+        if self.is_bare:
+            # Write blobs, tree and commit in one fast-import run, without an index
+            commands = [GIT_FAST_IMPORT, GIT_REV_PARSE_HEAD]
+        else:
+            commit_command = GIT_COMMIT + (commit_message,)
+            if author:
+                commit_command += ('--author', f"{author[0]} <{author[1]}>")
+            
+            # Stage, commit, resolve and optionally push in a single shell pipeline
+            commands = [GIT_ADD + tuple(file_paths), commit_command, GIT_REV_PARSE_HEAD]
+        if push:
+            commands.append(GIT_PUSH)
+        
+        env = self._get_push_env() if push else None
+        if date:
+            # Use the message's own timestamp instead of letting git read the clock
+            env = dict(env or os.environ, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date)
+        
+        with self._commit_lock:
+            input_data = None
+            if self.is_bare:
+                # The stream names its parent commit, so read the branch tip under the lock
+                input_data = self._fast_import_stream(files, commit_message, author, date)
+            returncode, stdout, stderr = self._run_git_pipeline(commands, env=env, input_data=input_data)
+        if returncode != 0:
+            logger.error(f"Failed to {'commit and push' if push else 'commit'}: {stderr}")
+            return None
+        
+        match = COMMIT_HASH_PATTERN.search(stdout)
+        if match is None:
+            logger.error(f"Failed to get commit hash: {stdout}")
+            return None
+        
+        return match.group(0)
+
+    def _push_worker(self):
+        """Push queued commits in batches until PUSH_STOP is queued."""
+        while True:
+            # None (a flush request) and PUSH_STOP end the batch immediately
+            pending = [self._push_queue.get()]
+            deadline = time.monotonic() + PUSH_INTERVAL
+            while pending[-1] is not None and pending[-1] is not PUSH_STOP and len(pending) < PUSH_BATCH_SIZE:
+                try:
+                    pending.append(self._push_queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            
+            if any(isinstance(commit_hash, str) for commit_hash in pending):
+                self._push_pending = True
+            try:
+                # Failed commits stay local and are retried by the next batch or flush
+                # A lone stop request follows the flush in close(), which already tried
+                if self._push_pending and pending != [PUSH_STOP] and self._push():
+                    self._push_pending = False
+                    logger.info("Successfully pushed queued commits")
+            except Exception as e:
+                logger.error(f"Failed to push queued commits: {str(e)}")
+            finally:
+                # Keep flush() from waiting forever, whatever happened
+                for _ in pending:
+                    self._push_queue.task_done()
+            
+            if pending[-1] is PUSH_STOP:
+                return
+
+    def enqueue_message(self, message: Dict) -> Optional[str]:
+        """
+        Commit a message locally and queue it for a background push to GitHub.
+        
+        Args:
+            message: Dictionary containing message data
+            
+        Returns:
+            Git commit hash if the local commit succeeded, None otherwise
+        """
+        try:
+            filename, data = message_file(self._store_out_of_band(message))
+            
+            commit_hash = self._commit(
+                {filename: data},
+                f"Add message {message['id']} from {message['sender']}",
+                (message['sender'], f"{message['sender']}@example.com"),
+                message.get('created_at')
+            )
+            if commit_hash is None:
+                logger.error(f"Failed to commit message {message['id']}")
                 return None
             
-            commit_hash = stdout.strip()
+            with self._commit_lock:
+                if self._push_thread is None:
+                    self._push_thread = threading.Thread(target=self._push_worker, daemon=True)
+                    self._push_thread.start()
+            self._push_queue.put(commit_hash)
             
-            # Push to GitHub
-            returncode, stdout, stderr = self._run_git_command(['push'])
-            if returncode != 0:
-                logger.error(f"Failed to push: {stderr}")
+            return commit_hash
+            
+        except Exception as e:
+            logger.error(f"Failed to enqueue message: {str(e)}")
+            return None
+
+    def flush(self) -> bool:
+        """
+        Push all queued commits and wait until the push has finished.
+        
+        Commits left over from an earlier failed push are pushed again.
+        
+        Returns:
+            True if every queued commit reached the remote, False otherwise
+        """
+        if self._push_thread is None:
+            return not self._push_pending
+        self._push_queue.put(None)
+        self._push_queue.join()
+        return not self._push_pending
+
+    def sync_message(self, message: Dict) -> Optional[str]:
+        """
+        Sync a message to GitHub.
+        
+        Args:
+            message: Dictionary containing message data
+            
+        Returns:
+            Git commit hash if successful, None otherwise
+        """
+        try:
+            filename, data = message_file(self._store_out_of_band(message))
+            
+            commit_hash = self._commit(
+                {filename: data},
+                f"Add message {message['id']} from {message['sender']}",
+                (message['sender'], f"{message['sender']}@example.com"),
+                message.get('created_at'),
+                push=True
+            )
+            if commit_hash is None:
+                logger.error(f"Failed to sync message {message['id']}")
                 return None
             
             logger.info(f"Successfully synced message {message['id']} with commit {commit_hash}")
@@ -120,21 +1028,115 @@ class GitSyncManager:
             logger.error(f"Failed to sync message: {str(e)}")
             return None
 
+    def sync_messages(self, messages: List[Dict]) -> Optional[str]:
+        """
+        Sync several messages to GitHub with a single commit and push.
+        
+        Args:
+            messages: List of dictionaries containing message data
+            
+        Returns:
+            Git commit hash if successful, None otherwise
+        """
+        if not messages:
+            return None
+        
+        try:
+            files = dict(message_file(self._store_out_of_band(message)) for message in messages)
+            
+            # Attribute the commit to the sender only when there is exactly one
+            senders = {message['sender'] for message in messages}
+            author = None
+            if len(senders) == 1:
+                sender = senders.pop()
+                author = (sender, f"{sender}@example.com")
+            
+            message_ids = ', '.join(str(message['id']) for message in messages)
+            commit_hash = self._commit(files, f"Add messages {message_ids}", author, push=True)
+            if commit_hash is None:
+                logger.error(f"Failed to sync messages {message_ids}")
+                return None
+            
+            logger.info(f"Successfully synced messages {message_ids} with commit {commit_hash}")
+            return commit_hash
+            
+        except Exception as e:
+            logger.error(f"Failed to sync messages: {str(e)}")
+            return None
+
     @staticmethod
-    def clone_repository(repo_url: str, local_path: str) -> bool:
+    def _update_clone_cache(repo_url: str, blobless: bool = False) -> Optional[str]:
+        """
+        Create or refresh the cached mirror of a remote repository.
+        
+        Args:
+            repo_url: URL of the GitHub repository
+            blobless: Mirror commits and trees only, for blob-less clones
+            
+        Returns:
+            Path of the cached mirror if it is usable, None otherwise
+        """
+        # Full clones cannot borrow from a blob-less mirror, so the two are kept apart
+        cache_key = hashlib.sha1(repo_url.encode('utf-8')).hexdigest()
+        if blobless:
+            cache_key += '-blobless'
+        cache_dir = os.path.join(CLONE_CACHE_DIR, cache_key)
+        if os.path.isdir(cache_dir):
+            # A blob-less mirror remembers its filter and keeps fetching without blobs
+            command = ['git', '--git-dir', cache_dir, 'fetch', '--prune']
+        else:
+            os.makedirs(CLONE_CACHE_DIR, exist_ok=True)
+            command = ['git', 'clone', '--mirror']
+            if blobless:
+                command.append('--filter=blob:none')
+            command += [repo_url, cache_dir]
+        
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning(f"Failed to update clone cache: {str(e)}")
+            return None
+        
+        if result.returncode != 0:
+            logger.warning(f"Failed to update clone cache: {result.stderr}")
+            return None
+        
+        return cache_dir
+
+    @staticmethod
+    def clone_repository(repo_url: str, local_path: str, use_cache: bool = True,
+                         depth: Optional[int] = 1, bare: bool = False) -> bool:
         """
         Clone a GitHub repository to local path.
         
         Args:
             repo_url: URL of the GitHub repository
             local_path: Local path to clone to
+            use_cache: Borrow objects from a cached mirror of the repository
+                so only new objects are downloaded
+            depth: Number of commits of history to fetch, or None for the
+                full history
+            bare: Clone without a worktree; messages are then committed
+                straight into the object database
             
         Returns:
             True if successful, False otherwise
         """
         try:
+            command = ['git', 'clone']
+            if bare:
+                # Bare clones track no upstream branch, so push the current one by name
+                command += ['--bare', '--config', 'push.default=current']
+            if depth is not None:
+                # Only the tip of the default branch is needed to add messages
+                command += [f'--depth={depth}', '--filter=blob:none', '--single-branch', '--no-tags']
+            cache_dir = GitSyncManager._update_clone_cache(repo_url, depth is not None) if use_cache else None
+            if cache_dir:
+                # Copy borrowed objects so the clone does not depend on the cache
+                command += ['--reference-if-able', cache_dir, '--dissociate']
+            
             result = subprocess.run(
-                ['git', 'clone', repo_url, local_path],
+                command + [repo_url, local_path],
                 capture_output=True,
                 text=True
             )
@@ -146,24 +1148,29 @@ class GitSyncManager:
                 logger.error(f"Failed to clone repository: {result.stderr}")
                 return False
                 
-        except subprocess.SubprocessError as e:
+        except (OSError, subprocess.SubprocessError) as e:
             logger.error(f"Failed to clone repository: {str(e)}")
             return False
 
-def init_repository(repo_url: str, local_path: str) -> Optional[GitSyncManager]:
+def init_repository(repo_url: str, local_path: str, bare: bool = False) -> Optional[GitSyncManager]:
     """
     Initialize or clone the repository and return a GitSyncManager instance.
     
     Args:
         repo_url: URL of the GitHub repository
         local_path: Local path for the repository
+        bare: Clone the repository without a worktree if it does not exist yet
         
     Returns:
         GitSyncManager instance if successful, None otherwise
     """
     try:
-        if not os.path.exists(os.path.join(local_path, '.git')):
-            success = GitSyncManager.clone_repository(repo_url, local_path)
+        exists = (
+            os.path.exists(os.path.join(local_path, '.git'))
+            or GitSyncManager._is_bare_repository(local_path)
+        )
+        if not exists:
+            success = GitSyncManager.clone_repository(repo_url, local_path, bare=bare)
             if not success:
                 return None
         
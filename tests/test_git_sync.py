@@ -3,10 +3,21 @@ import os
 import shutil
 import tempfile
 import json
+import hashlib
+import subprocess
+import threading
 from datetime import datetime
-from unittest.mock import patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import patch
+import git_sync
 from git_sync import GitSyncManager, init_repository
 
+COMMIT_HASH = '0123456789abcdef0123456789abcdef01234567'
+
+def fake_process(stdout, stderr='', returncode=0):
+    """Build a lightweight stand-in for a finished subprocess.Popen object."""
+    return SimpleNamespace(communicate=lambda: (stdout, stderr), returncode=returncode)
+
 class TestGitSync(unittest.TestCase):
     def setUp(self):
         """Set up test environment before each test."""
@@ -21,6 +32,15 @@ class TestGitSync(unittest.TestCase):
         })
         self.env_patcher.start()
         self.addCleanup(self.env_patcher.stop)
+        
+        # Keep SSH control sockets out of the user's cache directory
+        self.ssh_patcher = patch('git_sync.SSH_CONTROL_DIR', os.path.join(self.test_dir, 'ssh'))
+        self.ssh_patcher.start()
+        self.addCleanup(self.ssh_patcher.stop)
+        
+        # Configuration is cached per process
+        GitSyncManager.reset_config_cache()
+        self.addCleanup(GitSyncManager.reset_config_cache)
 
     def test_init_git_sync_manager(self):
         """Test GitSyncManager initialization."""
@@ -33,10 +53,7 @@ class TestGitSync(unittest.TestCase):
     def test_run_git_command(self, mock_popen):
         """Test running git commands."""
         # Mock successful git command
-        process_mock = MagicMock()
-        process_mock.communicate.return_value = ('output', '')
-        process_mock.returncode = 0
-        mock_popen.return_value = process_mock
+        mock_popen.return_value = fake_process('output')
 
         manager = GitSyncManager(self.test_dir)
         returncode, stdout, stderr = manager._run_git_command(['status'])
@@ -51,17 +68,49 @@ class TestGitSync(unittest.TestCase):
             cwd=self.test_dir,
             stdout=-1,
             stderr=-1,
+            text=True,
+            env=None
+        )
+
+    def test_run_git_command_batch(self):
+        """Test read-only git commands served by the persistent cat-file process."""
+        subprocess.run(['git', 'init', '-q', self.test_dir], check=True)
+        with open(os.path.join(self.test_dir, 'hello.txt'), 'w') as f:
+            f.write('hello\n')
+        subprocess.run(['git', 'add', 'hello.txt'], cwd=self.test_dir, check=True)
+        subprocess.run(
+            ['git', '-c', 'user.name=test', '-c', 'user.email=test@example.com',
+             'commit', '-q', '-m', 'Initial commit'],
+            cwd=self.test_dir,
+            check=True
+        )
+        expected_hash = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=self.test_dir,
+            capture_output=True,
             text=True
+        ).stdout
+        
+        manager = GitSyncManager(self.test_dir)
+        self.addCleanup(manager.close)
+        
+        self.assertEqual(manager._run_git_command(['rev-parse', 'HEAD']), (0, expected_hash, ''))
+        self.assertEqual(manager._run_git_command(['show', 'HEAD:hello.txt']), (0, 'hello\n', ''))
+        self.assertEqual(
+            manager._run_git_command(['cat-file', 'blob', 'HEAD:hello.txt']),
+            (0, 'hello\n', '')
         )
+        self.assertIsNotNone(manager._cat_file)
+        
+        # Missing objects are reported by git itself
+        returncode, _, _ = manager._run_git_command(['rev-parse', 'HEAD:missing.txt'])
+        self.assertNotEqual(returncode, 0)
 
     @patch('subprocess.Popen')
     def test_sync_message(self, mock_popen):
         """Test message synchronization."""
         # Mock successful git commands
-        process_mock = MagicMock()
-        process_mock.communicate.return_value = ('commit_hash', '')
-        process_mock.returncode = 0
-        mock_popen.return_value = process_mock
+        mock_popen.return_value = fake_process(COMMIT_HASH + '\n')
 
         manager = GitSyncManager(self.test_dir)
         test_message = {
@@ -86,14 +135,23 @@ class TestGitSync(unittest.TestCase):
         self.assertEqual(saved_message['content'], test_message['content'])
         self.assertEqual(saved_message['sender'], test_message['sender'])
 
+    def test_serialize_message(self):
+        """Test that both JSON serializers write the same bytes."""
+        message = {'id': 1, 'content': 'Grüße 👋', 'sender': 'test_user'}
+        expected = '{"id":1,"content":"Grüße 👋","sender":"test_user"}'.encode('utf-8')
+        self.assertEqual(git_sync.serialize_message(message), expected)
+        with patch('git_sync.orjson', None):
+            self.assertEqual(git_sync.serialize_message(message), expected)
+
     @patch('subprocess.Popen')
     def test_sync_message_with_content(self, mock_popen):
         """Test message synchronization with actual content."""
         # Mock successful git commands
-        process_mock = MagicMock()
-        process_mock.communicate.return_value = ('test_commit_hash', '')
-        process_mock.returncode = 0
-        mock_popen.return_value = process_mock
+        mock_popen.return_value = fake_process(
+            '[main 1a2b3c4] Add message 123 from test_user@example.com\n'
+            ' 1 file changed, 7 insertions(+)\n'
+            + COMMIT_HASH + '\n'
+        )
 
         manager = GitSyncManager(self.test_dir)
         
@@ -109,7 +167,7 @@ class TestGitSync(unittest.TestCase):
         # Test message sync
         commit_hash = manager.sync_message(test_message)
         self.assertIsNotNone(commit_hash)
-        self.assertEqual(commit_hash, 'test_commit_hash')
+        self.assertEqual(commit_hash, COMMIT_HASH)
         
         # Verify the message file was created with correct name format
         message_files = os.listdir(manager.messages_dir)
@@ -129,28 +187,615 @@ class TestGitSync(unittest.TestCase):
         self.assertEqual(saved_message['sender'], test_message['sender'])
         self.assertEqual(saved_message['timestamp'], test_message['timestamp'])
         
-        # Verify Git commands were called correctly
+        # Verify Git commands were run as a single pipeline after looking up the remote
         git_commands = [args[0] for args, _ in mock_popen.call_args_list]
+        self.assertEqual(git_commands[0], ['git', 'ls-remote', '--get-url'])
+        self.assertEqual(len(git_commands), 2)
+        argv = mock_popen.call_args[0][0]
+        self.assertEqual(argv[:2], ['sh', '-c'])
         
         # Should have called: git add, git commit, git rev-parse, git push
-        expected_commands = [
-            ['git', 'add'],
-            ['git', 'commit'],
-            ['git', 'rev-parse'],
-            ['git', 'push']
+        expected_commands = ['git add', 'git commit', 'git rev-parse HEAD', 'git push']
+        positions = [argv[2].find(command) for command in expected_commands]
+        self.assertNotIn(-1, positions)
+        self.assertEqual(positions, sorted(positions))
+        self.assertIn('git commit --no-verify --no-gpg-sign --quiet -m', argv[2])
+        
+        # Verify the commit is dated from the message
+        env = mock_popen.call_args[1]['env']
+        self.assertEqual(env['GIT_AUTHOR_DATE'], test_message['created_at'])
+        self.assertEqual(env['GIT_COMMITTER_DATE'], test_message['created_at'])
+
+    @patch('subprocess.Popen')
+    def test_sync_messages(self, mock_popen):
+        """Test synchronizing several messages with one commit."""
+        # Mock successful git commands
+        mock_popen.return_value = fake_process(COMMIT_HASH + '\n')
+
+        manager = GitSyncManager(self.test_dir)
+        test_messages = [
+            {
+                'id': message_id,
+                'content': f'Batched message {message_id}',
+                'timestamp': '2025-01-07T15:56:04-05:00',
+                'sender': 'test_user',
+                'created_at': '2025-01-07T15:56:04-05:00'
+            }
+            for message_id in (1, 2, 3)
         ]
+
+        # Test batch sync
+        commit_hash = manager.sync_messages(test_messages)
+        self.assertEqual(commit_hash, COMMIT_HASH)
+        
+        # Verify one file per message was created
+        message_files = sorted(os.listdir(manager.messages_dir))
+        self.assertEqual(message_files, [
+            '20250107_155604_1.json',
+            '20250107_155604_2.json',
+            '20250107_155604_3.json'
+        ])
+        
+        # Verify all files were committed and pushed by a single pipeline
+        self.assertEqual(mock_popen.call_count, 2)
+        script = mock_popen.call_args[0][0][2]
+        for filename in message_files:
+            self.assertEqual(script.count(filename), 1)
+        self.assertEqual(script.count('git push'), 1)
+
+    @patch('git_sync.PUSH_INTERVAL', 60)
+    @patch('subprocess.Popen')
+    def test_enqueue_message_and_flush(self, mock_popen):
+        """Test that queued messages are committed locally and pushed together."""
+        # Mock successful git commands
+        mock_popen.return_value = fake_process(COMMIT_HASH + '\n')
+
+        manager = GitSyncManager(self.test_dir)
+        for message_id in range(5):
+            commit_hash = manager.enqueue_message({
+                'id': message_id,
+                'content': f'Queued message {message_id}',
+                'timestamp': '2025-01-07T15:56:04-05:00',
+                'sender': 'test_user',
+                'created_at': '2025-01-07T15:56:04-05:00'
+            })
+            self.assertEqual(commit_hash, COMMIT_HASH)
+        
+        # Verify commits were made without pushing
+        git_commands = [args[0] for args, _ in mock_popen.call_args_list]
+        self.assertEqual(len(git_commands), 5)
+        for command in git_commands:
+            self.assertNotIn('git push', command[2])
+        
+        # Verify a single push happens once flushed
+        self.assertTrue(manager.flush())
+        git_commands = [args[0] for args, _ in mock_popen.call_args_list]
+        self.assertEqual(git_commands[5:], [['git', 'ls-remote', '--get-url'], ['git', 'push']])
+        
+        # Verify closing stops the push thread without pushing again
+        push_thread = manager._push_thread
+        manager.close()
+        self.assertFalse(push_thread.is_alive())
+        self.assertIsNone(manager._push_thread)
+        self.assertEqual(mock_popen.call_count, 7)
+
+    @patch('git_sync.PUSH_INTERVAL', 60)
+    @patch('subprocess.Popen')
+    def test_enqueue_message_push_raises(self, mock_popen):
+        """Test that a push raising an exception is reported and retried by the next flush."""
+        push_errors = [FileNotFoundError('git')]
+        def popen(command, **kwargs):
+            if command == ['git', 'push'] and push_errors:
+                raise push_errors.pop()
+            return fake_process(COMMIT_HASH + '\n')
+        mock_popen.side_effect = popen
+
+        manager = GitSyncManager(self.test_dir)
+        self.assertEqual(manager.enqueue_message({
+            'id': 1,
+            'content': 'Queued message',
+            'timestamp': '2025-01-07T15:56:04-05:00',
+            'sender': 'test_user',
+            'created_at': '2025-01-07T15:56:04-05:00'
+        }), COMMIT_HASH)
+
+        # Each flush returns, and the failed push is retried without new commits
+        results = []
+        for _ in range(3):
+            flush = threading.Thread(target=lambda: results.append(manager.flush()), daemon=True)
+            flush.start()
+            flush.join(timeout=5)
+            self.assertFalse(flush.is_alive())
+        self.assertEqual(results, [False, True, True])
+
+        git_commands = [args[0] for args, _ in mock_popen.call_args_list]
+        self.assertEqual(git_commands.count(['git', 'push']), 2)
+
+    @patch('subprocess.Popen')
+    def test_push_reuses_ssh_connection(self, mock_popen):
+        """Test that pushes share a multiplexed SSH connection."""
+        mock_popen.return_value = fake_process('git@github.com:test/repo.git\n')
+
+        manager = GitSyncManager(self.test_dir)
+        control_dir = os.path.join(self.test_dir, 'ssh')
+        os.environ.pop('GIT_SSH_COMMAND', None)
+        os.environ.pop('GIT_SSH', None)
+        self.assertTrue(manager._push())
+        
+        ssh_command = mock_popen.call_args[1]['env']['GIT_SSH_COMMAND']
+        self.assertIn('ControlMaster=auto', ssh_command)
+        self.assertIn(f'ControlPath={control_dir}/', ssh_command)
+        self.assertTrue(os.path.isdir(control_dir))
         
-        for expected, actual in zip(expected_commands, git_commands):
-            self.assertEqual(expected, actual[:len(expected)])
+        # A user-provided SSH command is left alone
+        with patch.dict('os.environ', {'GIT_SSH_COMMAND': 'ssh -i key'}):
+            self.assertTrue(manager._push())
+        self.assertIsNone(mock_popen.call_args[1]['env'])
+
+    @patch('subprocess.Popen')
+    def test_push_without_ssh_connection(self, mock_popen):
+        """Test that pushes use the plain environment when SSH is not set up."""
+        os.environ.pop('GIT_SSH_COMMAND', None)
+        os.environ.pop('GIT_SSH', None)
+        control_dir = os.path.join(self.test_dir, 'ssh')
+        
+        # HTTPS remotes do not use SSH at all
+        mock_popen.return_value = fake_process('https://github.com/test/repo.git\n')
+        manager = GitSyncManager(self.test_dir)
+        self.assertTrue(manager._push())
+        self.assertIsNone(mock_popen.call_args[1]['env'])
+        self.assertFalse(os.path.exists(control_dir))
+        
+        # An unusable control directory still lets the push through
+        mock_popen.return_value = fake_process('git@github.com:test/repo.git\n')
+        manager = GitSyncManager(self.test_dir)
+        with patch('git_sync.os.makedirs', side_effect=PermissionError(13, 'Permission denied')):
+            self.assertTrue(manager._push())
+        self.assertIsNone(mock_popen.call_args[1]['env'])
+
+    def _create_repository_with_remote(self):
+        """Create a working repository that pushes to a local bare remote."""
+        remote_path = os.path.join(self.test_dir, 'remote.git')
+        repo_path = os.path.join(self.test_dir, 'repo')
+        subprocess.run(['git', 'init', '-q', '--bare', remote_path], check=True)
+        subprocess.run(['git', 'clone', '-q', remote_path, repo_path], check=True, capture_output=True)
+        subprocess.run(['git', 'config', 'user.name', 'test'], cwd=repo_path, check=True)
+        subprocess.run(['git', 'config', 'user.email', 'test@example.com'], cwd=repo_path, check=True)
+        subprocess.run(['git', 'commit', '-q', '--allow-empty', '-m', 'Initial commit'], cwd=repo_path, check=True)
+        subprocess.run(['git', 'push', '-q', 'origin', 'HEAD'], cwd=repo_path, check=True, capture_output=True)
+        return repo_path, remote_path
+
+    @unittest.skipIf(git_sync.pygit2 is None, 'pygit2 is not installed')
+    def test_sync_message_in_process(self):
+        """Test message synchronization through pygit2 against a real remote."""
+        repo_path, remote_path = self._create_repository_with_remote()
+        manager = GitSyncManager(repo_path)
+        self.assertIsNotNone(manager._repo)
+        
+        test_message = {
+            'id': 789,
+            'content': 'Committed without git add',
+            'timestamp': '2025-01-07T15:56:04-05:00',
+            'sender': 'test_user',
+            'created_at': '2025-01-07T15:56:04-05:00'
+        }
+        commit_hash = manager.sync_message(test_message)
+        self.assertIsNotNone(commit_hash)
+        
+        # Verify the commit reached the remote with the message file
+        remote_log = subprocess.run(
+            ['git', 'log', '-1', '--format=%H%n%an%n%s%n%aI%n%cI', '--name-only'],
+            cwd=remote_path,
+            capture_output=True,
+            text=True
+        ).stdout.split('\n')
+        self.assertEqual(remote_log[:5], [
+            commit_hash,
+            'test_user',
+            'Add message 789 from test_user',
+            test_message['created_at'],
+            test_message['created_at']
+        ])
+        self.assertIn('messages/20250107_155604_789.json', remote_log)
+        
+        # Verify the working tree is clean afterwards
+        status = subprocess.run(
+            ['git', 'status', '--porcelain'],
+            cwd=repo_path,
+            capture_output=True,
+            text=True
+        ).stdout
+        self.assertEqual(status, '')
+
+    @unittest.skipIf(git_sync.pygit2 is None, 'pygit2 is not installed')
+    def test_sync_message_in_process_identity(self):
+        """Test that in-process commits resolve identities like the git command line."""
+        repo_path, remote_path = self._create_repository_with_remote()
+        for key in ('user.name', 'user.email'):
+            subprocess.run(['git', 'config', '--unset', key], cwd=repo_path, check=True)
+
+        with patch.dict('os.environ', {
+            'HOME': self.test_dir,
+            'GIT_AUTHOR_NAME': 'env_author',
+            'GIT_AUTHOR_EMAIL': 'author@example.com',
+            'GIT_COMMITTER_NAME': 'env_committer',
+            'GIT_COMMITTER_EMAIL': 'committer@example.com'
+        }):
+            manager = GitSyncManager(repo_path)
+            self.assertIsNotNone(manager._repo)
+
+            # Characters git strips from identities are stripped from the sender
+            self.assertIsNotNone(manager.sync_message({
+                'id': 1,
+                'content': 'Sent by a sender with an email-like name',
+                'timestamp': '2025-01-07T15:56:04-05:00',
+                'sender': 'Jane <jane>',
+                'created_at': '2025-01-07T15:56:04-05:00'
+            }))
+
+            # Without a single sender the author comes from the environment too
+            self.assertIsNotNone(manager.sync_messages([
+                {
+                    'id': message_id,
+                    'content': f'Message from {sender}',
+                    'timestamp': '2025-01-07T15:56:04-05:00',
+                    'sender': sender,
+                    'created_at': '2025-01-07T15:56:04-05:00'
+                }
+                for message_id, sender in ((2, 'alice'), (3, 'multi\nline'))
+            ]))
+
+        remote_log = subprocess.run(
+            ['git', 'log', '-2', '--format=%an <%ae> %cn <%ce>'],
+            cwd=remote_path,
+            capture_output=True,
+            text=True
+        ).stdout.splitlines()
+        self.assertEqual(remote_log, [
+            'env_author <author@example.com> env_committer <committer@example.com>',
+            'Jane jane <Jane jane@example.com> env_committer <committer@example.com>'
+        ])
+
+    @patch('git_sync.pygit2', None)
+    def test_sync_message_without_shell(self):
+        """Test that syncing falls back to separate git processes where there is no POSIX shell."""
+        repo_path, remote_path = self._create_repository_with_remote()
+        manager = GitSyncManager(repo_path)
+
+        test_message = {
+            'id': 987,
+            'content': 'Synced without sh',
+            'timestamp': '2025-01-07T15:56:04-05:00',
+            'sender': 'test_user',
+            'created_at': '2025-01-07T15:56:04-05:00'
+        }
+        with patch('git_sync.os.name', 'nt'), patch('subprocess.Popen', wraps=subprocess.Popen) as mock_popen:
+            commit_hash = manager.sync_message(test_message)
+        self.assertIsNotNone(commit_hash)
+
+        # Verify no shell was started and the commit reached the remote
+        for args, _ in mock_popen.call_args_list:
+            self.assertEqual(args[0][0], 'git')
+        remote_head = subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=remote_path,
+            capture_output=True,
+            text=True
+        ).stdout.strip()
+        self.assertEqual(remote_head, commit_hash)
+
+    @patch('subprocess.Popen')
+    def test_count_messages(self, mock_popen):
+        """Test enumerating and counting message files."""
+        # Mock successful git commands
+        mock_popen.return_value = fake_process(COMMIT_HASH + '\n')
+
+        manager = GitSyncManager(self.test_dir)
+        self.assertEqual(manager.count_messages(), 0)
+        
+        for message_id in (1, 2):
+            manager.sync_message({
+                'id': message_id,
+                'content': f'Counted message {message_id}',
+                'timestamp': '2025-01-07T15:56:04-05:00',
+                'sender': 'test_user',
+                'created_at': '2025-01-07T15:56:04-05:00'
+            })
+        self.assertEqual(manager.count_messages(), 2)
+        self.assertEqual(
+            sorted(manager.iter_messages()),
+            ['20250107_155604_1.json', '20250107_155604_2.json']
+        )
+        
+        # Files added behind the manager's back are picked up as well
+        with open(os.path.join(manager.messages_dir, '20250107_155604_3.json'), 'w') as f:
+            f.write('{}')
+        os.utime(manager.messages_dir, ns=(0, 0))
+        self.assertEqual(manager.count_messages(), 3)
+
+    def test_sync_message_bare_repository(self):
+        """Test committing messages into a bare repository without a worktree."""
+        _, remote_path = self._create_repository_with_remote()
+        
+        for use_pygit2 in (True, False):
+            if use_pygit2 and git_sync.pygit2 is None:
+                continue
+            with self.subTest(use_pygit2=use_pygit2), \
+                    patch('git_sync.pygit2', git_sync.pygit2 if use_pygit2 else None):
+                bare_path = os.path.join(self.test_dir, f'bare_{use_pygit2}.git')
+                subprocess.run(['git', 'clone', '-q', '--bare', remote_path, bare_path], check=True)
+                for key, value in [('user.name', 'test'), ('user.email', 'test@example.com'),
+                                   ('push.default', 'current')]:
+                    subprocess.run(['git', 'config', key, value], cwd=bare_path, check=True)
+                
+                manager = GitSyncManager(bare_path)
+                self.assertTrue(manager.is_bare)
+                self.assertFalse(os.path.exists(manager.messages_dir))
+                
+                test_message = {
+                    'id': 321,
+                    'content': 'Stored without a worktree',
+                    'timestamp': '2025-01-07T15:56:04-05:00',
+                    'sender': 'test_user',
+                    'created_at': '2025-01-07T15:56:04-05:00'
+                }
+                commit_hash = manager.sync_message(test_message)
+                self.assertIsNotNone(commit_hash)
+                
+                # Verify the remote received the message on top of the previous tree
+                remote_head = subprocess.run(
+                    ['git', 'rev-parse', 'HEAD'],
+                    cwd=remote_path,
+                    capture_output=True,
+                    text=True
+                ).stdout.strip()
+                self.assertEqual(remote_head, commit_hash)
+                saved_message = json.loads(subprocess.run(
+                    ['git', 'show', 'HEAD:messages/20250107_155604_321.json'],
+                    cwd=remote_path,
+                    capture_output=True,
+                    text=True
+                ).stdout)
+                self.assertEqual(saved_message, test_message)
+                
+                # Reset the remote for the next variant
+                subprocess.run(['git', 'update-ref', 'HEAD', 'HEAD~1'], cwd=remote_path, check=True)
+
+    @patch('git_sync.pygit2', None)
+    def test_commit_bare_repository_hostile_sender(self):
+        """Test that a sender cannot inject fast-import commands into a bare repository commit."""
+        bare_path = os.path.join(self.test_dir, 'bare.git')
+        subprocess.run(['git', 'init', '-q', '--bare', bare_path], check=True)
+        for key, value in [('user.name', 'test'), ('user.email', 'test@example.com')]:
+            subprocess.run(['git', 'config', key, value], cwd=bare_path, check=True)
+
+        manager = GitSyncManager(bare_path)
+        sender = 'evil> 0 +0000\nM 100644 inline README.injected\ndata 4\npwn\n<'
+        commit_hash = manager._commit(
+            {'20250107_155604_1.json': b'{}'},
+            f"Add message 1 from {sender}",
+            (sender, f"{sender}@example.com"),
+            '2025-01-07T15:56:04-05:00'
+        )
+        self.assertIsNotNone(commit_hash)
+
+        # Verify only the message file was committed and the author is a single line
+        files = subprocess.run(
+            ['git', 'ls-tree', '-r', '--name-only', commit_hash],
+            cwd=bare_path,
+            capture_output=True,
+            text=True
+        ).stdout.split()
+        self.assertEqual(files, ['messages/20250107_155604_1.json'])
+        author = subprocess.run(
+            ['git', 'log', '-1', '--format=%an%n%ae', commit_hash],
+            cwd=bare_path,
+            capture_output=True,
+            text=True
+        ).stdout
+        self.assertEqual(author, (
+            'evil 0 +0000M 100644 inline README.injecteddata 4pwn\n'
+            'evil 0 +0000M 100644 inline README.injecteddata 4pwn@example.com\n'
+        ))
+
+    def test_count_messages_concurrent_writes(self):
+        """Test that the cached count stays exact while messages are written concurrently."""
+        manager = GitSyncManager(self.test_dir)
+        self.assertEqual(manager.count_messages(), 0)
+
+        threads = [
+            threading.Thread(target=manager._write_message_file, args=(f'20250107_155604_{message_id}.json', b'{}'))
+            for message_id in range(32)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(manager.count_messages(), 32)
+
+    def test_count_messages_bare_repository(self):
+        """Test counting messages in a bare repository, which has no messages directory."""
+        bare_path = os.path.join(self.test_dir, 'bare.git')
+        subprocess.run(['git', 'init', '-q', '--bare', bare_path], check=True)
+        for key, value in [('user.name', 'test'), ('user.email', 'test@example.com')]:
+            subprocess.run(['git', 'config', key, value], cwd=bare_path, check=True)
+
+        manager = GitSyncManager(bare_path)
+        self.addCleanup(manager.close)
+        self.assertEqual(manager.count_messages(), 0)
+        self.assertEqual(list(manager.iter_messages()), [])
+
+        manager._commit(
+            {'20250107_155604_1.json': b'{}', '20250107_155604_2.json': b'{}'},
+            'Add messages 1, 2'
+        )
+        self.assertEqual(manager.count_messages(), 2)
+        self.assertEqual(
+            sorted(manager.iter_messages()),
+            ['20250107_155604_1.json', '20250107_155604_2.json']
+        )
+
+    @unittest.skipIf(git_sync.pygit2 is None, 'pygit2 is not installed')
+    def test_commit_in_process_hostile_sender(self):
+        """Test in-process commits with senders that are not valid git identities."""
+        repo_path, _ = self._create_repository_with_remote()
+        bare_path = os.path.join(self.test_dir, 'bare.git')
+        subprocess.run(['git', 'clone', '-q', '--bare', repo_path, bare_path], check=True)
+        for key, value in [('user.name', 'test'), ('user.email', 'test@example.com')]:
+            subprocess.run(['git', 'config', key, value], cwd=bare_path, check=True)
+
+        sender = 'evil> 0 +0000\nM 100644 inline README.injected\ndata 4\npwn\n<'
+        for path in (repo_path, bare_path):
+            with self.subTest(path=path):
+                manager = GitSyncManager(path)
+                self.assertIsNotNone(manager._repo)
+                commit_hash = manager._commit(
+                    {'20250107_155604_1.json': b'{}'},
+                    f"Add message 1 from {sender}",
+                    (sender, f"{sender}@example.com"),
+                    '2025-01-07T15:56:04-05:00'
+                )
+                self.assertIsNotNone(commit_hash)
+
+                # Verify only the message file was added and the author is a single line
+                files = subprocess.run(
+                    ['git', 'diff-tree', '--no-commit-id', '--name-only', '-r', commit_hash],
+                    cwd=path,
+                    capture_output=True,
+                    text=True
+                ).stdout.split()
+                self.assertEqual(files, ['messages/20250107_155604_1.json'])
+                author = subprocess.run(
+                    ['git', 'log', '-1', '--format=%an', commit_hash],
+                    cwd=path,
+                    capture_output=True,
+                    text=True
+                ).stdout
+                self.assertEqual(author, 'evil 0 +0000M 100644 inline README.injecteddata 4pwn\n')
+
+        # A sender that leaves no name at all fails without staging the message file
+        manager = GitSyncManager(repo_path)
+        with self.assertRaises(ValueError):
+            manager._commit({'20250107_155604_2.json': b'{}'}, 'Add message 2', ('<>', '<>'))
+        status = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'],
+            cwd=repo_path,
+            capture_output=True,
+            text=True
+        ).stdout
+        self.assertEqual(status, '')
+
+    @patch('git_sync.pygit2', None)
+    def test_commit_bare_repository_concurrently(self):
+        """Test that concurrent commits into a bare repository chain onto each other."""
+        bare_path = os.path.join(self.test_dir, 'bare.git')
+        subprocess.run(['git', 'init', '-q', '--bare', bare_path], check=True)
+        for key, value in [('user.name', 'test'), ('user.email', 'test@example.com')]:
+            subprocess.run(['git', 'config', key, value], cwd=bare_path, check=True)
+
+        manager = GitSyncManager(bare_path)
+        self.addCleanup(manager.close)
+        results = []
+        threads = [
+            threading.Thread(target=lambda message_id=message_id: results.append(manager._commit(
+                {f'20250107_155604_{message_id}.json': b'{}'},
+                f"Add message {message_id} from test_user"
+            )))
+            for message_id in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertNotIn(None, results)
+
+        # Verify every commit is on the branch with all message files
+        commit_count = subprocess.run(
+            ['git', 'rev-list', '--count', 'HEAD'],
+            cwd=bare_path,
+            capture_output=True,
+            text=True
+        ).stdout.strip()
+        self.assertEqual(commit_count, '8')
+        files = subprocess.run(
+            ['git', 'ls-tree', '-r', '--name-only', 'HEAD'],
+            cwd=bare_path,
+            capture_output=True,
+            text=True
+        ).stdout.split()
+        self.assertEqual(len(files), 8)
+
+    @patch('subprocess.Popen')
+    def test_sync_message_out_of_band(self, mock_popen):
+        """Test that large message content is stored outside the committed file."""
+        mock_popen.return_value = fake_process(COMMIT_HASH + '\n')
+
+        manager = GitSyncManager(self.test_dir)
+        content = '👋' * git_sync.OOB_THRESHOLD
+        test_message = {
+            'id': 654,
+            'content': content,
+            'timestamp': '2025-01-07T15:56:04-05:00',
+            'sender': 'test_user',
+            'created_at': '2025-01-07T15:56:04-05:00'
+        }
+
+        commit_hash = manager.sync_message(test_message)
+        self.assertEqual(commit_hash, COMMIT_HASH)
+        self.assertEqual(test_message['content'], content)
+        
+        # Verify only a reference was written to the message file
+        filename = '20250107_155604_654.json'
+        with open(os.path.join(manager.messages_dir, filename)) as f:
+            saved_message = json.load(f)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        self.assertEqual(saved_message['content'], {'oob': digest, 'size': len(content.encode('utf-8'))})
+        self.assertTrue(os.path.isfile(os.path.join(manager.oob_dir, digest)))
+        
+        # Verify the content is restored when reading the message back
+        self.assertEqual(manager.read_message(filename), test_message)
+        
+        # References that do not name a SHA-256 digest are refused
+        secret_path = os.path.join(self.test_dir, 'secret')
+        with open(secret_path, 'w') as f:
+            f.write('secret')
+        for reference in (secret_path, '../secret', digest.upper(), digest[:-1]):
+            with open(os.path.join(manager.messages_dir, filename), 'w') as f:
+                json.dump(dict(test_message, content={'oob': reference, 'size': 6}), f)
+            self.assertIsNone(manager.read_message(filename))
+
+    def test_out_of_band_bare_repository(self):
+        """Test that a bare repository keeps out-of-band content outside its git directory."""
+        bare_path = os.path.join(self.test_dir, 'bare.git')
+        subprocess.run(['git', 'init', '-q', '--bare', bare_path], check=True)
+        for key, value in [('user.name', 'test'), ('user.email', 'test@example.com')]:
+            subprocess.run(['git', 'config', key, value], cwd=bare_path, check=True)
+
+        manager = GitSyncManager(bare_path)
+        self.addCleanup(manager.close)
+        self.assertEqual(manager.oob_dir, bare_path + '.oob')
+
+        test_message = {
+            'id': 655,
+            'content': 'x' * (git_sync.OOB_THRESHOLD + 1),
+            'timestamp': '2025-01-07T15:56:04-05:00',
+            'sender': 'test_user',
+            'created_at': '2025-01-07T15:56:04-05:00'
+        }
+        filename, data = git_sync.message_file(manager._store_out_of_band(test_message))
+        self.assertIsNotNone(manager._commit({filename: data}, 'Add message 655'))
+        self.assertFalse(os.path.exists(os.path.join(bare_path, git_sync.OOB_DIR)))
+        self.assertEqual(manager.read_message(filename), test_message)
+
+        # An explicitly configured directory is used as is
+        oob_dir = os.path.join(self.test_dir, 'large')
+        self.assertEqual(GitSyncManager(bare_path, oob_dir=oob_dir).oob_dir, oob_dir)
 
     @patch('subprocess.Popen')
     def test_sync_message_failure(self, mock_popen):
         """Test handling of Git command failures during sync."""
         # Mock failed git command
-        process_mock = MagicMock()
-        process_mock.communicate.return_value = ('', 'error: failed to push')
-        process_mock.returncode = 1
-        mock_popen.return_value = process_mock
+        mock_popen.return_value = fake_process('', 'error: failed to push', returncode=1)
 
         manager = GitSyncManager(self.test_dir)
         test_message = {
@@ -173,21 +818,124 @@ class TestGitSync(unittest.TestCase):
     def test_clone_repository(self, mock_run):
         """Test repository cloning."""
         # Mock successful clone
-        mock_run.return_value = MagicMock(returncode=0)
+        mock_run.return_value = SimpleNamespace(returncode=0, stderr='')
+        cache_root = os.path.join(self.test_dir, 'cache')
+        local_path = os.path.join(self.test_dir, 'repo')
+
+        with patch('git_sync.CLONE_CACHE_DIR', cache_root):
+            success = GitSyncManager.clone_repository(
+                'https://github.com/test/repo.git',
+                local_path
+            )
+        self.assertTrue(success)
+        
+        # Verify a blob-less cache was populated before cloning from it
+        cache_dir = os.path.join(
+            cache_root,
+            hashlib.sha1(b'https://github.com/test/repo.git').hexdigest() + '-blobless'
+        )
+        self.assertEqual(mock_run.call_args_list[0][0][0], [
+            'git', 'clone', '--mirror', '--filter=blob:none', 'https://github.com/test/repo.git', cache_dir
+        ])
+        
+        # Verify clone command was called correctly
+        mock_run.assert_called_with(
+            ['git', 'clone', '--depth=1', '--filter=blob:none', '--single-branch', '--no-tags',
+             '--reference-if-able', cache_dir, '--dissociate',
+             'https://github.com/test/repo.git', local_path],
+            capture_output=True,
+            text=True
+        )
+
+    @patch('subprocess.run')
+    def test_clone_repository_cached(self, mock_run):
+        """Test repository cloning with an existing cache entry."""
+        mock_run.return_value = SimpleNamespace(returncode=0, stderr='')
+        cache_root = os.path.join(self.test_dir, 'cache')
+        cache_dir = os.path.join(
+            cache_root,
+            hashlib.sha1(b'https://github.com/test/repo.git').hexdigest() + '-blobless'
+        )
+        os.makedirs(cache_dir)
+
+        with patch('git_sync.CLONE_CACHE_DIR', cache_root):
+            success = GitSyncManager.clone_repository(
+                'https://github.com/test/repo.git',
+                os.path.join(self.test_dir, 'repo')
+            )
+        self.assertTrue(success)
+        
+        # Verify the cache was refreshed instead of cloned again
+        self.assertEqual(mock_run.call_args_list[0][0][0], [
+            'git', '--git-dir', cache_dir, 'fetch', '--prune'
+        ])
+
+    @patch('subprocess.run')
+    def test_clone_repository_full_history_cached(self, mock_run):
+        """Test that full-history clones use a mirror with every blob."""
+        mock_run.return_value = SimpleNamespace(returncode=0, stderr='')
+        cache_root = os.path.join(self.test_dir, 'cache')
+        local_path = os.path.join(self.test_dir, 'repo')
+
+        with patch('git_sync.CLONE_CACHE_DIR', cache_root):
+            success = GitSyncManager.clone_repository(
+                'https://github.com/test/repo.git',
+                local_path,
+                depth=None
+            )
+        self.assertTrue(success)
+        
+        cache_dir = os.path.join(cache_root, hashlib.sha1(b'https://github.com/test/repo.git').hexdigest())
+        self.assertEqual(mock_run.call_args_list[0][0][0], [
+            'git', 'clone', '--mirror', 'https://github.com/test/repo.git', cache_dir
+        ])
+        mock_run.assert_called_with(
+            ['git', 'clone', '--reference-if-able', cache_dir, '--dissociate',
+             'https://github.com/test/repo.git', local_path],
+            capture_output=True,
+            text=True
+        )
+
+    @patch('subprocess.run')
+    def test_clone_repository_without_cache(self, mock_run):
+        """Test a full-history repository clone without the clone cache."""
+        mock_run.return_value = SimpleNamespace(returncode=0, stderr='')
 
         success = GitSyncManager.clone_repository(
             'https://github.com/test/repo.git',
-            self.test_dir
+            self.test_dir,
+            use_cache=False,
+            depth=None
         )
         self.assertTrue(success)
         
-        # Verify clone command was called correctly
-        mock_run.assert_called_with(
+        mock_run.assert_called_once_with(
             ['git', 'clone', 'https://github.com/test/repo.git', self.test_dir],
             capture_output=True,
             text=True
         )
 
+    @patch('subprocess.run')
+    def test_clone_repository_bare(self, mock_run):
+        """Test cloning a repository without a worktree."""
+        mock_run.return_value = SimpleNamespace(returncode=0, stderr='')
+
+        success = GitSyncManager.clone_repository(
+            'https://github.com/test/repo.git',
+            self.test_dir,
+            use_cache=False,
+            depth=None,
+            bare=True
+        )
+        self.assertTrue(success)
+        
+        mock_run.assert_called_once_with(
+            ['git', 'clone', '--bare', '--config', 'push.default=current',
+             'https://github.com/test/repo.git', self.test_dir],
+            capture_output=True,
+            text=True
+        )
+
     @patch('git_sync.GitSyncManager.clone_repository')
     def test_init_repository(self, mock_clone):
         """Test repository initialization."""
@@ -202,13 +950,34 @@ class TestGitSync(unittest.TestCase):
         # Verify clone was called
         mock_clone.assert_called_with(
             'https://github.com/test/repo.git',
-            self.test_dir
+            self.test_dir,
+            bare=False
         )
 
+    @patch('git_sync.GitSyncManager.clone_repository')
+    def test_init_repository_bare(self, mock_clone):
+        """Test that an existing bare repository is opened instead of cloned again."""
+        bare_path = os.path.join(self.test_dir, 'bare.git')
+        subprocess.run(['git', 'init', '-q', '--bare', bare_path], check=True)
+
+        manager = init_repository('https://github.com/test/repo.git', bare_path, bare=True)
+        self.assertIsNotNone(manager)
+        self.assertTrue(manager.is_bare)
+        mock_clone.assert_not_called()
+
+    def test_config_is_cached(self):
+        """Test that configuration is read once until the cache is reset."""
+        GitSyncManager(self.test_dir)
+        with patch.dict('os.environ', {'GITHUB_TOKEN': 'other_token'}):
+            self.assertEqual(GitSyncManager(self.test_dir).github_token, 'test_token')
+            GitSyncManager.reset_config_cache()
+            self.assertEqual(GitSyncManager(self.test_dir).github_token, 'other_token')
+
     def test_missing_env_variables(self):
         """Test handling of missing environment variables."""
         # Remove environment variables
         with patch.dict('os.environ', {}, clear=True):
+            GitSyncManager.reset_config_cache()
             with self.assertRaises(ValueError):
                 GitSyncManager(self.test_dir)
 